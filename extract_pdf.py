@@ -1,11 +1,14 @@
 import shutil
+from concurrent.futures import ProcessPoolExecutor
 from constants import OUTPUT_DIR, INPUT_DIR
 import logging
-from dataclasses import astuple, dataclass
 from pathlib import Path
+from typing import NamedTuple
 
 import pandas as pd
 import pdfplumber
+from pdfplumber.page import Page
+from pdfplumber.pdf import PDF
 from pdfminer.image import ImageWriter
 from pdfminer.layout import LTImage
 from pdfplumber.table import Table
@@ -27,40 +30,46 @@ LAST_SPIN_SPIN_PAGE = 100
 
 FIRST_PAGE = FIRST_FLEXIBILITY_PAGE
 LAST_PAGE = LAST_SPIN_SPIN_PAGE
-FIRST_PAGE_INDEX = FIRST_FLEXIBILITY_PAGE - 1
-LAST_PAGE_INDEX = LAST_SPIN_SPIN_PAGE
 
 VERTICAL_LINES = [35, 75, 175, 305, 350, 564]
 
+TABLE_COLUMNS = ["code", "name", "element", "technicalValue", "criteria"]
 
-@dataclass
-class Boundaries:
+PAGES_TO_DEBUG = []
+
+
+class Boundaries(NamedTuple):
     left: int
     top: int
     right: int
     bottom: int
 
 
-def get_crop_boundaries(page_number: int) -> Boundaries:
-    boundaries = Boundaries(35, 45, 565, 775)
+# Pages where the table starts lower than usual (first page of a section)
+CROP_TOPS = {26: 210, 54: 75, 76: 75, 84: 75}
+DEFAULT_CROP_TOP = 45
+
+NARROW_VERTICAL_LINES = [35, 75, 170, 305, 345, 564]
+SHORT_VERTICAL_LINES = [35, 75, 175, 305, 350, 560]
+DEFAULT_VERTICAL_LINES = [35, 75, 175, 305, 350, 565]
+PAGE_VERTICAL_LINES = {
+    29: NARROW_VERTICAL_LINES,
+    30: NARROW_VERTICAL_LINES,
+    31: NARROW_VERTICAL_LINES,
+    32: NARROW_VERTICAL_LINES,
+    33: NARROW_VERTICAL_LINES,
+    69: SHORT_VERTICAL_LINES,
+    70: SHORT_VERTICAL_LINES,
+    83: SHORT_VERTICAL_LINES,
+}
 
-    match page_number:
-        case 26:
-            boundaries.top = 210
-        case 54 | 76 | 84:
-            boundaries.top = 75
 
-    return boundaries
+def get_crop_boundaries(page_number: int) -> Boundaries:
+    return Boundaries(35, CROP_TOPS.get(page_number, DEFAULT_CROP_TOP), 565, 775)
 
 
 def get_vertical_lines(page_number: int) -> list:
-    match page_number:
-        case 29 | 30 | 31 | 32 | 33:
-            return [35, 75, 170, 305, 345, 564]
-        case 69 | 70 | 83:
-            return [35, 75, 175, 305, 350, 560]
-        case _:
-            return [35, 75, 175, 305, 350, 565]
+    return PAGE_VERTICAL_LINES.get(page_number, DEFAULT_VERTICAL_LINES)
 
 def create_image(image_data: dict, name: str = "image") -> LTImage:
     bbox = (
@@ -93,12 +102,12 @@ def get_format(page_number: int):
 def extract_element_data(table: Table) -> pd.DataFrame:
     table_data = table.extract()
 
-    df = pd.DataFrame(table_data[1:], columns=table_data[0])
-    df.columns = ["code", "name", "element", "technicalValue", "criteria"]
+    # Skip the header row, the column names are fixed
+    df = pd.DataFrame.from_records(table_data[1:], columns=TABLE_COLUMNS)
 
-    return df
+    return df.drop(columns="element")
 
-def extract_table_images(table: Table, df: pd.DataFrame):
+def extract_table_images(page: Page, table: Table, df: pd.DataFrame):
     for row_index, row in enumerate(
         table.rows[1:]
     ):  # skip first row because its the header
@@ -134,55 +143,73 @@ def extract_table_images(table: Table, df: pd.DataFrame):
             imagewriter.export_image(lt_image)
 
 
-if __name__ == "__main__":
-    PAGES_TO_DEBUG = []
+# PDF opened once per worker process by open_pdf. Parsed pages keep a handle
+# on the open file and can't be pickled, so they can't be shared from the
+# parent. Opening the document only takes a few tens of milliseconds anyway.
+pdf: PDF | None = None
 
-    logger.info("Removing image output directory")
-    shutil.rmtree(EXTRACTED_IMAGES_DIR, ignore_errors=True)
 
-    with pdfplumber.open(INPUT_PDF) as pdf:
-        dfs: list[pd.DataFrame] = []
+def open_pdf(path: Path):
+    global pdf
+    pdf = pdfplumber.open(path)
 
-        for page_number, page in enumerate(
-            pdf.pages[FIRST_PAGE_INDEX:LAST_PAGE_INDEX], FIRST_PAGE
-        ):
-            logger.info("Parsing page number %i", page_number)
 
-            # Crop page to an area aound the table
-            crop_boundaries = get_crop_boundaries(page_number=page_number)
-            cropped = page.crop(astuple(crop_boundaries))
-            table_settings = {
-                "vertical_strategy": "explicit",
-                "explicit_vertical_lines": get_vertical_lines(page_number),
-            }
+def parse_page(page_number: int) -> pd.DataFrame | None:
+    logger.info("Parsing page number %i", page_number)
 
-            # Debug visually.
-            if page_number in PAGES_TO_DEBUG:
-                image = cropped.to_image(resolution=200)
-                image.reset().debug_tablefinder(table_settings)
-                image.show()
-                continue
+    assert pdf is not None, "open_pdf must run in the worker first"
+    page = pdf.pages[page_number - 1]
 
-            table = cropped.find_table(table_settings=table_settings)
-            if not table:
-                logger.warning(f"No table found in page {page_number}")
-                continue
+    # Release the parsed page layout whatever happens, the worker keeps the
+    # document open
+    try:
+        # Crop page to an area aound the table
+        crop_boundaries = get_crop_boundaries(page_number=page_number)
+        cropped = page.crop(crop_boundaries)
+        table_settings = {
+            "vertical_strategy": "explicit",
+            "explicit_vertical_lines": get_vertical_lines(page_number),
+        }
 
-            df = extract_element_data(table)
-            df["page"] = page_number
-            df["format"] = get_format(page_number)
-            dfs.append(df)
+        # Debug visually.
+        if page_number in PAGES_TO_DEBUG:
+            image = cropped.to_image(resolution=200)
+            image.reset().debug_tablefinder(table_settings)
+            image.show()
+            return None
 
-            # extract images
-            extract_table_images(table, df)
+        table = cropped.find_table(table_settings=table_settings)
+        if not table:
+            logger.warning(f"No table found in page {page_number}")
+            return None
 
-            dfs.append(df)
+        df = extract_element_data(table)
+        df["technicalValue"] = df["technicalValue"].astype(float)
+        df["page"] = page_number
+        df["format"] = get_format(page_number)
 
-        df = pd.concat(dfs)
+        # extract images
+        extract_table_images(page, table, df)
 
-        df = df.drop(
-            ["element"], axis=1, errors="ignore"
-        )
-        df = df.astype({"technicalValue": float, "page": int})
+        return df
+    finally:
+        page.close()
+
+
+if __name__ == "__main__":
+    logger.info("Removing image output directory")
+    shutil.rmtree(EXTRACTED_IMAGES_DIR, ignore_errors=True)
+    EXTRACTED_IMAGES_DIR.mkdir(parents=True)
+
+    # Pages are independent, parse them in parallel
+    with ProcessPoolExecutor(initializer=open_pdf, initargs=(INPUT_PDF,)) as executor:
+        dfs = [
+            df
+            for df in executor.map(parse_page, range(FIRST_PAGE, LAST_PAGE + 1))
+            if df is not None
+        ]
+
+    # Columns are already typed per page
+    df = pd.concat(dfs)
 
-        df.to_csv(EXTRACTED_ELEMENTS_PATH, index=False)
+    df.to_csv(EXTRACTED_ELEMENTS_PATH, index=False)
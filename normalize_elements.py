@@ -60,31 +60,23 @@ class CriteriaType(StrEnum):
 def normalize_name(name: str):
     return name.replace("\n", " - ")
 
-def get_criteria_type(key: str) -> CriteriaType:
-    match key:
-        case "grip_is" | "arm_position" |"grip" |"arm_position/grip" | "grip/arm_position" | "arm/position_grip" | "arm_position_/_grip":
-            return CriteriaType.ARM_GRIP
-
-        case "body_position" | "-_body_position":
-            return CriteriaType.BODY_POSITION
-
-        case "hold_the_position":
-            return CriteriaType.HOLD
-
-        case "points_of_contact":
-            return CriteriaType.POINTS_OF_CONTACT
-
-        case "leg_position":
-            return CriteriaType.LEG_POSITION
-
-        case "angle_of_split":
-            return CriteriaType.ANGLE_OF_SPLIT
-
-        case "starting_position":
-            return CriteriaType.STARTING_POSITION
-
-        case _:
-            return CriteriaType.UNKNOWN
+# Raw criteria keys, as written in the PDF, mapped to their criteria type
+CRITERIA_TYPES: dict[str, CriteriaType] = {
+    "grip_is": CriteriaType.ARM_GRIP,
+    "arm_position": CriteriaType.ARM_GRIP,
+    "grip": CriteriaType.ARM_GRIP,
+    "arm_position/grip": CriteriaType.ARM_GRIP,
+    "grip/arm_position": CriteriaType.ARM_GRIP,
+    "arm/position_grip": CriteriaType.ARM_GRIP,
+    "arm_position_/_grip": CriteriaType.ARM_GRIP,
+    "body_position": CriteriaType.BODY_POSITION,
+    "-_body_position": CriteriaType.BODY_POSITION,
+    "hold_the_position": CriteriaType.HOLD,
+    "points_of_contact": CriteriaType.POINTS_OF_CONTACT,
+    "leg_position": CriteriaType.LEG_POSITION,
+    "angle_of_split": CriteriaType.ANGLE_OF_SPLIT,
+    "starting_position": CriteriaType.STARTING_POSITION,
+}
 
 class DataclassJSONEncoder(json.JSONEncoder):
     def default(self, o):
@@ -111,7 +103,7 @@ def normalize_criteria(text: str) -> list[Criterion]:
             key = key.strip().lower().replace(" ", "_")
             value = value.strip().replace("\n"," ")
 
-            criterion_type = get_criteria_type(key)
+            criterion_type = CRITERIA_TYPES.get(key, CriteriaType.UNKNOWN)
             data.setdefault(criterion_type, []).append(value)
 
     return [ Criterion(type=type, items=items) for type, items in data.items()]
@@ -121,8 +113,12 @@ def normalize_criteria(text: str) -> list[Criterion]:
 def save_rows_as_json(df: pd.DataFrame, output_dir: Path, id_column="id"):
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    for _, row in df.iterrows():
-        record = row.dropna().to_dict()
+    # Convert all rows at once, then leave out the missing values of each row
+    records = df.to_dict(orient="records")
+    present = df.notna().to_dict(orient="records")
+
+    for row, row_present in zip(records, present):
+        record = {key: value for key, value in row.items() if row_present[key]}
         file_id = record[id_column]
 
         filepath = output_dir.joinpath(f"{file_id}.json")
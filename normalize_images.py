@@ -1,7 +1,10 @@
 from extract_pdf import EXTRACTED_IMAGES_DIR
 from constants import INPUT_DIR, OUTPUT_DIR
+import math
+import os
 import re
 import shutil
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
 import tkinter as tk
 from pathlib import Path
 import logging
@@ -13,39 +16,49 @@ NORMALIZED_IMAGE_DIR = OUTPUT_DIR.joinpath("normalized/images")
 
 NORMALIZED_IMAGE_DIR.mkdir(exist_ok=True)
 
-SPLIT_PATTERN = re.compile(
-    r"^([A-Za-z]{1,2}\d{1,3})_(\d+)_of_(\d+)\.jpe?g$", re.IGNORECASE
+# Matches both "F1.jpg" and split parts like "F1_2_of_3.jpg"
+IMAGE_PATTERN = re.compile(
+    r"^([A-Za-z]{1,2}\d{1,3})(?:_(\d+)_of_(\d+))?\.jpe?g$", re.IGNORECASE
 )
-NORMAL_PATTERN = re.compile(r"^([A-Za-z]{1,2}\d{1,3})\.jpe?g$", re.IGNORECASE)
 
 SIZES = [400, 800]
 BLUR_SIZE = 20
 
 WEBP_QUALITY = 80
+WEBP_METHOD = 4
+
+MAX_PREVIEW_WIDTH = 1200
+PREVIEW_GAP = 20
+# Previews are only shown on screen, a cheaper filter than LANCZOS is enough
+PREVIEW_RESAMPLE = Image.Resampling.BILINEAR
 
 logger = logging.getLogger("normalize_images")
 logging.basicConfig(level=logging.INFO)
 
 
-def resize_to_width(img, target_width):
+def resize_to_width(img, target_width, resample=Image.Resampling.LANCZOS):
     if img.width == target_width:
         return img
     ratio = target_width / img.width
     new_height = int(img.height * ratio)
-    return img.resize((target_width, new_height), Image.Resampling.LANCZOS)
+    return img.resize((target_width, new_height), resample)
 
 
-def resize_to_height(img, target_height):
+def resize_to_height(img, target_height, resample=Image.Resampling.LANCZOS):
     if img.height == target_height:
         return img
     ratio = target_height / img.height
     new_width = int(img.width * ratio)
-    return img.resize((new_width, target_height), Image.Resampling.LANCZOS)
+    return img.resize((new_width, target_height), resample)
 
 
-def combine_vertical(images):
-    max_width = max(img.width for img in images)
-    resized = [resize_to_width(img, max_width) for img in images]
+def combine_vertical(images, resample=Image.Resampling.LANCZOS):
+    widths = [img.width for img in images]
+    max_width = max(widths)
+    if min(widths) == max_width:
+        resized = images
+    else:
+        resized = [resize_to_width(img, max_width, resample) for img in images]
 
     total_height = sum(img.height for img in resized)
     result = Image.new("RGB", (max_width, total_height))
@@ -57,9 +70,13 @@ def combine_vertical(images):
     return result
 
 
-def combine_horizontal(images):
-    max_height = max(img.height for img in images)
-    resized = [resize_to_height(img, max_height) for img in images]
+def combine_horizontal(images, resample=Image.Resampling.LANCZOS):
+    heights = [img.height for img in images]
+    max_height = max(heights)
+    if min(heights) == max_height:
+        resized = images
+    else:
+        resized = [resize_to_height(img, max_height, resample) for img in images]
 
     total_width = sum(img.width for img in resized)
     result = Image.new("RGB", (total_width, max_height))
@@ -71,6 +88,26 @@ def combine_horizontal(images):
     return result
 
 
+def combine_vertical_preview(images, target_width):
+    resized = [resize_to_width(img, target_width, PREVIEW_RESAMPLE) for img in images]
+    return combine_vertical(resized, PREVIEW_RESAMPLE)
+
+
+def combine_horizontal_preview(images, target_height):
+    resized = [resize_to_height(img, target_height, PREVIEW_RESAMPLE) for img in images]
+    return combine_horizontal(resized, PREVIEW_RESAMPLE)
+
+
+def get_preview_scale(sizes: list[tuple[int, int]]) -> float:
+    # One factor for both orientations, so they fit side by side in the
+    # preview window and are shown at the same scale
+    max_width = max(width for width, _ in sizes)
+    max_height = max(height for _, height in sizes)
+    horizontal_width = sum(width * max_height / height for width, height in sizes)
+
+    return min(1.0, (MAX_PREVIEW_WIDTH - PREVIEW_GAP) / (max_width + horizontal_width))
+
+
 # ---------- GUI ----------
 
 
@@ -83,12 +120,11 @@ class ChoiceWindow:
         preview = self.build_preview(vertical_img, horizontal_img)
 
         # Scale preview if too large
-        max_preview_width = 1200
-        if preview.width > max_preview_width:
-            ratio = max_preview_width / preview.width
+        if preview.width > MAX_PREVIEW_WIDTH:
+            ratio = MAX_PREVIEW_WIDTH / preview.width
             preview = preview.resize(
                 (int(preview.width * ratio), int(preview.height * ratio)),
-                Image.Resampling.LANCZOS,
+                PREVIEW_RESAMPLE,
             )
 
         self.tk_image = ImageTk.PhotoImage(preview)
@@ -116,7 +152,7 @@ class ChoiceWindow:
         self.root.mainloop()
 
     def build_preview(self, vertical_img, horizontal_img):
-        gap = 20
+        gap = PREVIEW_GAP
         bg = (30, 30, 30)
 
         width = vertical_img.width + horizontal_img.width + gap
@@ -150,7 +186,7 @@ def save_webp(img, path):
         path,
         "WEBP",
         quality=WEBP_QUALITY,
-        method=6
+        method=WEBP_METHOD,
     )
 
 def generate_sizes_from_image(img: Image.Image, element_id: str):
@@ -170,64 +206,111 @@ def generate_sizes_from_image(img: Image.Image, element_id: str):
 
 def generate_sizes(image_path: Path):
     element_id = image_path.stem
+    logger.info(f"Processing {element_id}")
 
     img = Image.open(image_path).convert("RGB")
 
     generate_sizes_from_image(img, element_id)
 
-def ensure_directories():
-    for size in SIZES:
-        (NORMALIZED_IMAGE_DIR / str(size)).mkdir(parents=True, exist_ok=True)
 
-    (NORMALIZED_IMAGE_DIR / "blur").mkdir(parents=True, exist_ok=True)
+def build_previews(image_paths: list[Path]) -> tuple[Image.Image, Image.Image]:
+    # Only the headers are read here, pixels are decoded by convert
+    images = [Image.open(p) for p in image_paths]
 
+    sizes = [img.size for img in images]
+    scale = get_preview_scale(sizes)
+    target_width = max(1, round(max(width for width, _ in sizes) * scale))
+    target_height = max(1, round(max(height for _, height in sizes) * scale))
 
+    previews = []
+    for img in images:
+        # Size of the part in whichever orientation shows it larger
+        part_scale = max(target_width / img.width, target_height / img.height)
+        draft_size = (
+            math.ceil(img.width * part_scale),
+            math.ceil(img.height * part_scale),
+        )
 
-def main():
-    ensure_directories()
+        # Let the JPEG decoder downscale while decoding, when the preview is
+        # at most half the original size
+        img.draft("RGB", draft_size)
+        previews.append(img.convert("RGB"))
+        img.close()
 
-    grouped: dict[str, list[tuple[int, Path]]] = {}
-    singles: list[Path] = []
+    vertical = combine_vertical_preview(previews, target_width)
+    horizontal = combine_horizontal_preview(previews, target_height)
 
-    # Scan files
-    for file in EXTRACTED_IMAGES_DIR.iterdir():
-        name = file.name
+    for img in previews:
+        img.close()
+    return vertical, horizontal
 
-        split_match = SPLIT_PATTERN.match(name)
-        normal_match = NORMAL_PATTERN.match(name)
 
-        if split_match:
-            base, idx, total = split_match.groups()
-            grouped.setdefault(base, []).append((int(idx), file))
-        elif normal_match:
-            singles.append(file)
+def generate_combined_sizes(image_paths: list[Path], element_id: str, choice: str):
+    # Only decode at full resolution for the chosen orientation
+    images = [Image.open(p).convert("RGB") for p in image_paths]
+    combine = combine_vertical if choice == "v" else combine_horizontal
 
-    # Copy non-split images
-    for file in singles:
-        logger.info(f"Processing {file.stem}")
-        generate_sizes(file)
+    generate_sizes_from_image(combine(images), element_id)
 
-    # Process split images
-    for base, parts in grouped.items():
-        parts.sort(key=lambda x: x[0])
-        image_paths = [p for _, p in parts]
+    for img in images:
+        img.close()
 
-        print(f"\nProcessing {base}")
 
-        images = [Image.open(p).convert("RGB") for p in image_paths]
+def ensure_directories():
+    for size in SIZES:
+        (NORMALIZED_IMAGE_DIR / str(size)).mkdir(parents=True, exist_ok=True)
 
-        vertical = combine_vertical(images)
-        horizontal = combine_horizontal(images)
+    (NORMALIZED_IMAGE_DIR / "blur").mkdir(parents=True, exist_ok=True)
 
-        chooser = ChoiceWindow(vertical, horizontal)
-        choice = chooser.choice
 
-        result = vertical if choice == "v" else horizontal
 
-        generate_sizes_from_image(result, base)
+def main():
+    ensure_directories()
+
+    grouped: dict[str, list[tuple[int, Path]]] = {}
+    singles: list[Path] = []
+
+    # Scan files
+    with os.scandir(EXTRACTED_IMAGES_DIR) as entries:
+        for entry in entries:
+            match = IMAGE_PATTERN.match(entry.name)
+            if not match:
+                continue
+
+            file = Path(entry.path)
+            base, idx, total = match.groups()
+            if idx:
+                grouped.setdefault(base, []).append((int(idx), file))
+            else:
+                singles.append(file)
+
+    # The GUI has to stay in this process, all image work goes to the pool
+    with ProcessPoolExecutor() as executor:
+        # Submit previews first so the first choice shows up as soon as possible
+        previews: dict[Future, tuple[str, list[Path]]] = {}
+        for base, parts in grouped.items():
+            parts.sort(key=lambda x: x[0])
+            image_paths = [p for _, p in parts]
+            previews[executor.submit(build_previews, image_paths)] = (base, image_paths)
+
+        # Non-split images
+        renders = [executor.submit(generate_sizes, file) for file in singles]
+
+        # Split images, in the order their previews are ready
+        for future in as_completed(previews):
+            base, image_paths = previews[future]
+
+            print(f"\nProcessing {base}")
+
+            vertical, horizontal = future.result()
+            chooser = ChoiceWindow(vertical, horizontal)
+
+            renders.append(
+                executor.submit(generate_combined_sizes, image_paths, base, chooser.choice)
+            )
 
-        for img in images:
-            img.close()
+        for future in renders:
+            future.result()
 
 
 if __name__ == "__main__":